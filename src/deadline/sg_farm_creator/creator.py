@@ -1,39 +1,195 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
-import argparse
+import concurrent.futures
+import contextlib
+import functools
 import json
-import logging
-import sys
+import os
+import random
 import time
-import traceback
+from pathlib import Path
+
+# orjson is optional; it parses bytes directly and faster than the standard library
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 import deadline_cloud_util
 import logutil
 
 
-# Logging to file
-logutil.add_file_handler()
-logger = logging.getLogger(__name__)
-logger.setLevel(logutil.get_deadline_config_level())
+__all__ = [
+    "FLEET_CONFIGURATION_PATH",
+    "FarmCreationError",
+    "clean_up",
+    "create_farm_and_fleet",
+    "load_json_document",
+]
+
 
-# Logging to stdout
-log_handler = logging.StreamHandler()
-log_fmt = logging.Formatter(
-    "%(asctime)s - [%(levelname)-7s] "
-    "[%(module)s:%(funcName)s:%(lineno)d] %(message)s"
-)
-log_handler.setFormatter(log_fmt)
-logger.addHandler(log_handler)
+# Logging to file and stdout
+logger = logutil.configure(__name__)
 
 
 FLEET_CONFIGURATION_PATH = "configuration/cmf_default.json"
-ROLE_CHANGE_WAIT_SECONDS = 6
+
+# Retry attempts and backoff bounds for calls on newly created resources
+GET_QUEUE_ATTEMPTS = 3
+ROLE_CHANGE_ATTEMPTS = 8
+ROLE_CHANGE_TIMEOUT_SECONDS = 18
+RETRY_BASE_WAIT_SECONDS = 0.25
+RETRY_MAX_WAIT_SECONDS = 8
+
+# Runs independent AWS calls and document loads alongside each other.
+# Shared by all farm creation runs in the process.
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+
+def _reset_executor_after_fork():
+    """
+    Replaces the executor inherited from the parent process, whose worker threads
+    don't survive a fork, so submitted calls would never run in the child.
+    """
+    
+    global _EXECUTOR
+    
+    _EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor_after_fork)
+
+
+class FarmCreationError(Exception):
+    """Raised when a farm creation step fails. The message is reported to the caller."""
+
+
+def _run_step(error_msg, fn, *args, **kwargs):
+    """
+    Calls a farm creation step, raising FarmCreationError
+    if it raises or doesn't return a result.
+    
+    Args:
+        error_msg: (str) Message for the error raised on failure
+        fn: (callable) Step to call with the remaining arguments
+    
+    Return:
+        Result of the step
+    """
+    
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        raise FarmCreationError(error_msg) from e
+    
+    if not result:
+        raise FarmCreationError(error_msg)
+    
+    return result
 
 
-def get_json_document(json_path=None):
+def _clean_up_resource(delete_fn, **kwargs):
     """
-    Validates the specified path contains a JSON document
-    and returns the document as a string.
+    Removes a resource created during a farm creation run.
+    Failures are logged rather than raised so remaining resources are still removed.
+    
+    Args:
+        delete_fn: (callable) deadline_cloud_util function that removes the resource
+    """
+    
+    try:
+        result = delete_fn(**kwargs)
+        logger.debug("%s %s: %s", delete_fn.__name__, kwargs, result)
+    except Exception:
+        logger.debug("%s failed", delete_fn.__name__, exc_info=True)
+
+
+def _clean_up_queue(queue_future, farm_id=None):
+    """
+    Removes a queue being created in the background, once its creation finishes.
+    
+    Args:
+        queue_future: (concurrent.futures.Future) Future for the queue's creation
+        farm_id: (str) Farm ID
+    """
+    
+    try:
+        queue_id = queue_future.result()
+    except Exception:
+        # Nothing was created
+        return
+    
+    if queue_id:
+        _clean_up_resource(deadline_cloud_util.delete_queue, farm_id=farm_id, queue_id=queue_id)
+
+
+def _retry_with_backoff(
+    fn,
+    attempts=5,
+    base_seconds=RETRY_BASE_WAIT_SECONDS,
+    cap_seconds=RETRY_MAX_WAIT_SECONDS,
+    min_total_seconds=0,
+    retry_error_names=None
+):
+    """
+    Calls a function until it returns a result, waiting between attempts
+    with exponential backoff and full jitter.
+    
+    Full jitter can make the total wait short, so callers waiting on something
+    that takes a minimum time to happen (e.g. IAM propagation) set min_total_seconds
+    to keep retrying until that long has passed since the first call.
+    
+    Exceptions raised by the function are logged and count as a failed attempt,
+    unless retry_error_names is set and doesn't name the exception's class,
+    in which case it is raised.
+    
+    Args:
+        fn: (callable) Function to call, taking no arguments
+        attempts: (int) Minimum number of calls
+        base_seconds: (float) Upper bound of the first wait
+        cap_seconds: (float) Upper bound of any wait
+        min_total_seconds: (float) Time since the first call before giving up
+        retry_error_names: (tuple) Names of the exception classes to retry, or None to retry all
+    
+    Return:
+        Result of the first successful call, or None if all attempts failed
+    """
+    
+    deadline = time.monotonic() + min_total_seconds
+    attempt = 0
+    while True:
+        result = None
+        try:
+            result = fn()
+        except Exception as e:
+            if retry_error_names is not None and e.__class__.__name__ not in retry_error_names:
+                raise
+            logger.debug("Attempt %d raised", attempt + 1, exc_info=True)
+        
+        if result:
+            return result
+        
+        attempt += 1
+        logger.debug("Attempt %d failed", attempt)
+        
+        remaining_seconds = deadline - time.monotonic()
+        if attempt >= attempts and remaining_seconds <= 0:
+            return None
+        
+        wait_seconds = random.uniform(0, min(cap_seconds, base_seconds * 2 ** min(attempt - 1, 32)))
+        if attempt >= attempts:
+            # Only waiting out the deadline now, so don't overshoot it
+            wait_seconds = min(wait_seconds, remaining_seconds)
+        time.sleep(wait_seconds)
+
+
+def load_json_document(json_path=None):
+    """
+    Loads the JSON document at the specified path.
+    
+    Parsed documents are cached until the file is modified, and the
+    cached document is shared between calls, so it must not be modified.
     
     Returns None if the document cannot be parsed as JSON.
     
@@ -41,32 +197,53 @@ def get_json_document(json_path=None):
         json_path: (str) Path to JSON document
     
     Return:
-        (str) Document contents
+        (dict) Document contents
+    """
+    
+    try:
+        modified_time = os.path.getmtime(json_path)
+    except Exception:
+        logger.debug("Couldn't stat %s", json_path, exc_info=True)
+        logger.error("Couldn't read policy document: %s", json_path)
+        return None
+    
+    return _load_json_document(json_path, modified_time)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_json_document(json_path, modified_time):
+    """
+    Reads and parses the JSON document at the specified path.
+    
+    Args:
+        json_path: (str) Path to JSON document
+        modified_time: (float) Modification time of the document, used as part of the cache key
+    
+    Return:
+        (dict) Document contents
     """
     
     contents_raw = None
     try:
-        with open(json_path, "r") as f:
-            contents_raw = f.read()
-    except:
-        logger.debug(traceback.format_exc())
+        contents_raw = Path(json_path).read_bytes()
+    except Exception:
+        logger.debug("Couldn't read %s", json_path, exc_info=True)
     
     if not contents_raw:
-        logger.error(f"Couldn't read policy document: {json_path}")
+        logger.error("Couldn't read policy document: %s", json_path)
         return None
     
-    # Ensure valid JSON
-    contents_raw_json = None
+    contents = None
     try:
-        contents_raw_json = json.loads(contents_raw)
-    except:
-        logger.debug(traceback.format_exc())
+        contents = json_loads(contents_raw)
+    except Exception:
+        logger.debug("Couldn't parse %s", json_path, exc_info=True)
     
-    if not contents_raw_json:
-        logger.error(f"Couldn't interpret policy document as JSON: {json_path}")
+    if not contents:
+        logger.error("Couldn't interpret policy document as JSON: %s", json_path)
         return None
     
-    return contents_raw
+    return contents
 
 
 def create_farm_and_fleet(
@@ -118,276 +295,202 @@ def create_farm_and_fleet(
     name_farm_sanitized = name_farm.replace(" ", "_")
     role_name_fleet = f"{name_farm_sanitized}FleetRole"
     
-    # Get caller identity for account ID and fleet role ARN
-    fleet_role_arn = None
-    try:
-        caller_identity = deadline_cloud_util.get_caller_identity()
-        if "Account" in caller_identity:
-            fleet_role_arn = f"arn:aws:iam::{caller_identity['Account']}:role/{role_name_fleet}"
-            logger.debug(f"fleet_role_arn: {fleet_role_arn}")
-        else:
-            logger.error(f"Get caller identity didn't return Account")
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not fleet_role_arn:
-        error_msg = f"Get caller identity failed"
-        logger.error(error_msg)
-        return {"error": error_msg}
-    
-    
-    # Track progress for completion and clean_up
-    progress = {}
-    
-    
-    # Create farm with specified name
-    farm_id = None
-    try:
-        farm_id = deadline_cloud_util.create_farm(
-            display_name=name_farm,
-            studio_id=studio_id
-        )
-        progress["farm_id"] = farm_id
-    except:
-        error_msg = traceback.format_exc()
-        logger.error(error_msg)
-        return {"error": error_msg}
-    
-    
-    if not farm_id:
-        error_msg = "Farm creation failed"
-        logger.error(error_msg)
-        return {"error": error_msg}
-    
-    logger.debug(f"farm_id: {farm_id}")
-    
+    pd_fleet_role_path = "policy/iam_fleet_role.json"
+    pd_worker_permissions_path = "policy/iam_fleet_worker_permissions.json"
     
-    # Create queue on farm
-    queue_id = None
-    try:
-        queue_id = deadline_cloud_util.create_queue(
-            display_name=name_queue,
-            farm_id=farm_id,
-            job_run_as_user=job_run_as_user,
-            job_attachment_settings=job_attachment_settings
-        )
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not queue_id:
-        error_msg = "Queue creation failed"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
+    # None of these depend on the farm, so run them while the farm is created
+    caller_identity_future = _EXECUTOR.submit(deadline_cloud_util.get_caller_identity)
+    pd_fleet_role_future = _EXECUTOR.submit(load_json_document, pd_fleet_role_path)
+    pd_worker_permissions_future = _EXECUTOR.submit(load_json_document, pd_worker_permissions_path)
+    fleet_configuration_future = _EXECUTOR.submit(load_json_document, fleet_configuration_path)
     
-    logger.debug(f"queue_id: {queue_id}")
     
+    # Track progress for completion
+    progress = {}
     
-    # Check that queue is available for interaction
-    queue_retries_total = 3
-    queue_retries = 0
-    while queue_retries < queue_retries_total:
-        queue_result = None
+    # Each created resource registers its removal, so a failure removes
+    # everything created so far in reverse order of creation
+    with contextlib.ExitStack() as clean_up_stack:
         try:
-            queue_result = deadline_cloud_util.get_queue(
+            # Create farm with specified name
+            farm_id = _run_step(
+                "Farm creation failed",
+                deadline_cloud_util.create_farm,
+                display_name=name_farm,
+                studio_id=studio_id
+            )
+            progress["farm_id"] = farm_id
+            clean_up_stack.callback(_clean_up_resource, deadline_cloud_util.delete_farm, farm_id=farm_id)
+            logger.debug("farm_id: %s", farm_id)
+            
+            
+            # Get caller identity for account ID and fleet role ARN
+            caller_identity = _run_step("Get caller identity failed", caller_identity_future.result)
+            if "Account" not in caller_identity:
+                raise FarmCreationError("Get caller identity didn't return Account")
+            
+            fleet_role_arn = f"arn:aws:iam::{caller_identity['Account']}:role/{role_name_fleet}"
+            logger.debug("fleet_role_arn: %s", fleet_role_arn)
+            
+            
+            # Create queue on farm. The fleet role doesn't depend on it,
+            # so it is created alongside it and awaited before the fleet is created.
+            queue_future = _EXECUTOR.submit(
+                deadline_cloud_util.create_queue,
+                display_name=name_queue,
                 farm_id=farm_id,
-                queue_id=queue_id
+                job_run_as_user=job_run_as_user,
+                job_attachment_settings=job_attachment_settings
             )
-        except:
-            logger.debug(traceback.format_exc())
-        
-        if queue_result:
-            progress["queue_id"] = queue_result
-            break
-        else:
-            logger.warning("get_queue didn't return queueId")
-        
-        queue_retries += 1
-    
-    if not progress["queue_id"]:
-        error_msg = f"Couldn't get created queue after {queue_retries} retries"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    
-    # Get fleet role policy document
-    pd_fleet_role_dict = None
-    pd_fleet_role_path = "policy/iam_fleet_role.json"
-    try:
-        pd_fleet_role_dict = json.loads(get_json_document(pd_fleet_role_path))
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not pd_fleet_role_dict:
-        error_msg = f"Couldn't get fleet role policy document: {pd_fleet_role_path}"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    
-    # Update role policy document with AssumeRole conditions
-    region_id = studio_id.split(":")[0]
-    if "Statement" in pd_fleet_role_dict and pd_fleet_role_dict["Statement"]:
-        for s in pd_fleet_role_dict["Statement"]:
+            clean_up_stack.callback(_clean_up_queue, queue_future, farm_id=farm_id)
+            
+            
+            # Get fleet role policy document
+            pd_fleet_role_dict = _run_step(
+                f"Couldn't get fleet role policy document: {pd_fleet_role_path}",
+                pd_fleet_role_future.result
+            )
+            
+            
+            # Build the role policy document with AssumeRole conditions.
+            # The loaded document is shared, so copy the statements being changed.
+            if not pd_fleet_role_dict.get("Statement"):
+                raise FarmCreationError("Statement not found in fleet role dictionary")
+            
+            region_id = studio_id.split(":")[0]
+            account_id = str(caller_identity["Account"])
+            assume_role_condition = {
+                "StringEquals": {"aws:SourceAccount": account_id},
+                "ArnEquals": {"aws:SourceArn": f"arn:aws:deadline:{region_id}:{account_id}:farm/{farm_id}"}
+            }
+            pd_fleet_role_dict = {
+                **pd_fleet_role_dict,
+                "Statement": [
+                    {**s, "Condition": assume_role_condition} if s.get("Action") == "sts:AssumeRole" else s
+                    for s in pd_fleet_role_dict["Statement"]
+                ]
+            }
+            
+            logger.debug("pd_fleet_role_dict: %s", pd_fleet_role_dict)
+            
+            
+            # Check if fleet role already exists
+            role = None
             try:
-                if s["Action"] == "sts:AssumeRole":
-                    s["Condition"] = {
-                        "StringEquals": {"aws:SourceAccount": str(caller_identity['Account'])},
-                        "ArnEquals": {"aws:SourceArn": f"arn:aws:deadline:{region_id}:{str(caller_identity['Account'])}:farm/{farm_id}"}
-                }
-            except:
-                error_msg = f"Couldn't set sts:AssumeRole condition"
-                logger.error(error_msg)
-                clean_up(progress)
-                return {"error": error_msg}
-    else:
-        error_msg = "Statement not found in fleet role dictionary"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    logger.debug(f"pd_fleet_role_dict: {pd_fleet_role_dict}")
-    
-    
-    # Check if fleet role already exists
-    role = None
-    try:
-        role = deadline_cloud_util.get_role(role_name=role_name_fleet)
-    except Exception as e:
-        # Ignore if not found
-        if e.__class__.__name__ == "NoSuchEntityException":
-            pass
-        else:
-            logger.debug(traceback.format_exc())
-    
-    if role:
-        logger.warning(f"Fleet role already exists: {role_name_fleet}")
-    else:
-        # Create fleet role with policy document
-        try:
-            role = deadline_cloud_util.create_role(
+                role = deadline_cloud_util.get_role(role_name=role_name_fleet)
+            except Exception as e:
+                # Ignore if not found
+                if e.__class__.__name__ != "NoSuchEntityException":
+                    logger.debug("get_role failed", exc_info=True)
+            
+            # Don't change IAM resources for a queue that has already failed
+            if queue_future.done():
+                _run_step("Queue creation failed", queue_future.result)
+            
+            if role:
+                logger.warning("Fleet role already exists: %s", role_name_fleet)
+            else:
+                # Create fleet role with policy document
+                _run_step(
+                    "Fleet role creation failed",
+                    deadline_cloud_util.create_role,
+                    role_name=role_name_fleet,
+                    assume_role_policy_document=json.dumps(pd_fleet_role_dict)
+                )
+                progress["role_name"] = role_name_fleet
+                clean_up_stack.callback(_clean_up_resource, deadline_cloud_util.delete_role, role_name=role_name_fleet)
+            
+            
+            # Get WorkerPermissions policy document
+            policy_name = "WorkerPermissions"
+            pd_worker_permissions = _run_step(
+                f"Couldn't get {policy_name} policy document: {pd_worker_permissions_path}",
+                pd_worker_permissions_future.result
+            )
+            
+            
+            # Attach WorkerPermissions to the fleet role from the policy document
+            _run_step(
+                f"Couldn't attach {policy_name} policy to fleet role",
+                deadline_cloud_util.put_role_policy,
                 role_name=role_name_fleet,
-                assume_role_policy_document=json.dumps(pd_fleet_role_dict)
+                policy_name=policy_name,
+                policy_document=json.dumps(pd_worker_permissions)
             )
-            progress["role_name"] = role_name_fleet
-        except:
-            logger.debug(traceback.format_exc())
-        
-        if not role:
-            error_msg = f"Fleet role creation failed"
-            logger.error(error_msg)
-            clean_up(progress)
-            return {"error": error_msg}
-        else:
-            pass
-    
-    
-    # Get WorkerPermissions policy document
-    policy_name = "WorkerPermissions"
-    pd_worker_permissions_path = "policy/iam_fleet_worker_permissions.json"
-    pd_worker_permissions = None
-    try:
-        pd_worker_permissions = get_json_document(pd_worker_permissions_path)
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not pd_worker_permissions:
-        error_msg = f"Couldn't get {policy_name} policy document: {pd_worker_permissions_path}"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    
-    # Attach WorkerPermissions to the fleet role from the policy document
-    role_policy = None
-    try:
-        role_policy = deadline_cloud_util.put_role_policy(
-            role_name=role_name_fleet,
-            policy_name=policy_name,
-            policy_document=pd_worker_permissions
-        )
-        progress["role_policy"] = {
-            "role_name": role_name_fleet,
-            "policy_name": policy_name
-        }
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not role_policy:
-        error_msg = f"Fleet role creation failed"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-        
-        
-    # Get fleet configuration document as a Python dict for input to create_fleet()
-    fleet_configuration = None
-    try:
-        fleet_configuration = json.loads(get_json_document(fleet_configuration_path))
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not fleet_configuration:
-        error_msg = f"Couldn't get fleet configuration document: {fleet_configuration_path}"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    
-    # Create a fleet with the user's specified configuration
-    role_change_retries_total = 3
-    role_change_retries = 0
-    while role_change_retries < role_change_retries_total:
-        # Wait for the fleet role permissions change to take effect.
-        # Without waiting, the sts:AssumeRole in create_fleet will fail.
-        time.sleep(ROLE_CHANGE_WAIT_SECONDS)
-
-        # Create the fleet
-        fleet_id = None
-        try:
-            fleet_id = deadline_cloud_util.create_fleet(
-                display_name=name_fleet,
+            progress["role_policy"] = {
+                "role_name": role_name_fleet,
+                "policy_name": policy_name
+            }
+            clean_up_stack.callback(
+                _clean_up_resource,
+                deadline_cloud_util.delete_role_policy,
+                role_name=role_name_fleet,
+                policy_name=policy_name
+            )
+            
+            
+            # Wait for the queue and check that it is available for interaction,
+            # so a failed queue doesn't wait out the fleet creation retries first
+            queue_id = _run_step("Queue creation failed", queue_future.result)
+            logger.debug("queue_id: %s", queue_id)
+            
+            # The new queue may not be visible yet, which botocore doesn't retry
+            progress["queue_id"] = _run_step(
+                f"Couldn't get created queue after {GET_QUEUE_ATTEMPTS} attempts",
+                _retry_with_backoff,
+                functools.partial(deadline_cloud_util.get_queue, farm_id=farm_id, queue_id=queue_id),
+                attempts=GET_QUEUE_ATTEMPTS,
+                retry_error_names=("ResourceNotFoundException",)
+            )
+            
+            
+            # Get fleet configuration document as a Python dict for input to create_fleet()
+            fleet_configuration = _run_step(
+                f"Couldn't get fleet configuration document: {fleet_configuration_path}",
+                fleet_configuration_future.result
+            )
+            
+            
+            # Create a fleet with the user's specified configuration.
+            # The sts:AssumeRole in create_fleet fails until the fleet role permissions
+            # change takes effect, so retry with backoff until it succeeds.
+            fleet_id = _run_step(
+                f"Fleet creation failed after {ROLE_CHANGE_TIMEOUT_SECONDS} seconds. Please check fleet role: {fleet_role_arn}",
+                _retry_with_backoff,
+                functools.partial(
+                    deadline_cloud_util.create_fleet,
+                    display_name=name_fleet,
+                    farm_id=farm_id,
+                    role_arn=fleet_role_arn,
+                    max_worker_count=max_worker_count,
+                    configuration=fleet_configuration
+                ),
+                attempts=ROLE_CHANGE_ATTEMPTS,
+                min_total_seconds=ROLE_CHANGE_TIMEOUT_SECONDS
+            )
+            progress["fleet_id"] = fleet_id
+            clean_up_stack.callback(_clean_up_resource, deadline_cloud_util.delete_fleet, farm_id=farm_id, fleet_id=fleet_id)
+            logger.debug("fleet_id: %s", fleet_id)
+            
+            
+            # Create a queue-fleet association
+            logger.debug("create_queue_fleet_association")
+            associate_result = _run_step(
+                "Fleet queue association failed",
+                deadline_cloud_util.create_queue_fleet_association,
                 farm_id=farm_id,
-                role_arn=fleet_role_arn,
-                max_worker_count=max_worker_count,
-                configuration=fleet_configuration
+                queue_id=queue_id,
+                fleet_id=fleet_id
             )
-            logger.debug(f"fleet_id: {fleet_id}")
-        except:
-            logger.debug(traceback.format_exc())
-    
-        if fleet_id:
-            break
+            logger.debug("associate_result: %s", associate_result)
+            
+        except FarmCreationError as e:
+            logger.debug("Farm creation step failed", exc_info=True)
+            logger.error(e)
+            return {"error": str(e)}
         
-        role_change_retries += 1
-    
-    if not fleet_id:
-        error_msg = f"Fleet creation failed after {role_change_retries} retries. Please check fleet role: {fleet_role_arn}"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
-    
-    # Create a queue-fleet association
-    associate_result = None
-    logger.debug("create_queue_fleet_association")
-    try:
-        associate_result = deadline_cloud_util.create_queue_fleet_association(
-            farm_id=farm_id,
-            queue_id=queue_id,
-            fleet_id=fleet_id
-        )
-        logger.debug(f"associate_result: {associate_result}")
-    except:
-        logger.debug(traceback.format_exc())
-    
-    if not associate_result:
-        error_msg = f"Fleet queue association failed"
-        logger.error(error_msg)
-        clean_up(progress)
-        return {"error": error_msg}
-    
+        # Everything was created, so keep it
+        clean_up_stack.pop_all()
     
     return progress
 
@@ -407,42 +510,51 @@ def clean_up(resources=None):
     
     cleaned = {}
     
-    logger.debug(f"resources: {resources}")
+    logger.debug("resources: %s", resources)
     
     if "role_policy" in resources:
-        logger.debug(f"delete role_policy {resources['role_policy']}")
+        logger.debug("delete role_policy %s", resources['role_policy'])
         try:
             cleaned["delete_role_policy"] = deadline_cloud_util.delete_role_policy(
                 role_name=resources["role_policy"]["role_name"],
                 policy_name=resources["role_policy"]["policy_name"]
             )
-        except:
-            logger.debug(traceback.format_exc())
+        except Exception:
+            logger.debug("delete_role_policy failed", exc_info=True)
     
     if "role_name" in resources:
         try:
             cleaned["role_name"] = deadline_cloud_util.delete_role(role_name=resources["role_name"])
-        except:
-            logger.debug(traceback.format_exc())
+        except Exception:
+            logger.debug("delete_role failed", exc_info=True)
+    
+    if "fleet_id" in resources:
+        try:
+            cleaned["delete_fleet"] = deadline_cloud_util.delete_fleet(farm_id=resources["farm_id"], fleet_id=resources["fleet_id"])
+        except Exception:
+            logger.debug("delete_fleet failed", exc_info=True)
 
     if "queue_id" in resources:
         try:
             cleaned["delete_queue"] = deadline_cloud_util.delete_queue(farm_id=resources["farm_id"], queue_id=resources["queue_id"])
-        except:
-            logger.debug(traceback.format_exc())
+        except Exception:
+            logger.debug("delete_queue failed", exc_info=True)
     
     if "farm_id" in resources:
         try:
             cleaned["delete_farm"] = deadline_cloud_util.delete_farm(farm_id=resources["farm_id"])
-        except:
-            logger.debug(traceback.format_exc())
+        except Exception:
+            logger.debug("delete_farm failed", exc_info=True)
 
-    logger.debug(f"cleaned: {cleaned}")
+    logger.debug("cleaned: %s", cleaned)
     
     return cleaned
 
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+    
     parser = argparse.ArgumentParser(
         description="Create a farm, queue, and fleet in a studio."
     )
@@ -469,6 +581,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "-m", "--max_worker_count",
         help="Maximum worker count for autoscaling",
+        type=int,
         default=1
     )
     parser.add_argument(
@@ -498,9 +611,7 @@ if __name__ == "__main__":
     
     args = parser.parse_args(sys.argv[1:])
     
-    fleet_configuration_path = None
-    if not args.fleet_configuration_path:
-        fleet_configuration_path = FLEET_CONFIGURATION_PATH
+    fleet_configuration_path = args.fleet_configuration_path or FLEET_CONFIGURATION_PATH
     
     _farm_result = create_farm_and_fleet(
         studio_id=args.studio_id,
@@ -508,7 +619,7 @@ if __name__ == "__main__":
         name_queue=args.queue,
         name_fleet=args.fleet,
         fleet_configuration_path=fleet_configuration_path,
-        max_worker_count=int(args.max_worker_count),
+        max_worker_count=args.max_worker_count,
         job_run_as_user={"posix":{"user":args.user,"group":args.group}, "runAs": args.run_as},
         job_attachment_settings={"s3BucketName": args.job_attachment_bucket, "rootPrefix": args.root_prefix}
     )
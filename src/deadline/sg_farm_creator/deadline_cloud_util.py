@@ -1,25 +1,149 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
-import logging
+import os
+import threading
 
 import logutil
 
+from botocore.config import Config
 from deadline.client import api
 
+__all__ = [
+    "create_farm",
+    "create_fleet",
+    "create_queue",
+    "create_queue_fleet_association",
+    "create_role",
+    "delete_farm",
+    "delete_fleet",
+    "delete_queue",
+    "delete_role",
+    "delete_role_policy",
+    "get_caller_identity",
+    "get_queue",
+    "get_role",
+    "put_role_policy",
+]
+
+
+# Logging to file and stdout
+logger = logutil.configure(__name__)
+
+
+# Throttled and failed calls are retried by botocore, with client-side rate limiting.
+# TCP keep-alive stops idle pooled connections from being dropped between calls.
+# Set as the session's default client config, so clients still get the Deadline
+# client library's own settings (endpoint URL, region, user agent) on top of it.
+_BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    retries={"max_attempts": 10, "mode": "adaptive"},
+    connect_timeout=5,
+    read_timeout=30
+)
 
-# Logging to file
-logutil.add_file_handler()
-logger = logging.getLogger(__name__)
-logger.setLevel(logutil.get_deadline_config_level())
+# Clients are expensive to construct, so one is kept per service and reused.
+# They are all created from one boto3 session so credentials are resolved once.
+_boto3_session = None
+_clients = {}
+_clients_lock = threading.Lock()
 
-# Logging to stdout
-log_handler = logging.StreamHandler()
-log_fmt = logging.Formatter(
-    "%(asctime)s - [%(levelname)-7s] "
-    "[%(module)s:%(funcName)s:%(lineno)d] %(message)s"
-)
-log_handler.setFormatter(log_fmt)
-logger.addHandler(log_handler)
+
+def _get_client(service_name):
+    """
+    Returns the boto3 client for the specified service,
+    creating it on first use.
+    
+    Args:
+        service_name: (str) AWS service name, e.g. "deadline"
+    
+    Return:
+        (botocore.client.BaseClient) Service client
+    """
+    
+    global _boto3_session
+    
+    with _clients_lock:
+        if service_name not in _clients:
+            if _boto3_session is None:
+                _boto3_session = api._session.get_boto3_session()
+                botocore_session = _boto3_session._session
+                default_config = botocore_session.get_default_client_config()
+                botocore_session.set_default_client_config(
+                    default_config.merge(_BOTO_CONFIG) if default_config else _BOTO_CONFIG
+                )
+            _clients[service_name] = api._session.get_boto3_client(service_name)
+        return _clients[service_name]
+
+
+def _http_ok(response):
+    """
+    Checks the response metadata of an API call that returns no data,
+    warning if the call had to be retried.
+    
+    Args:
+        response: (dict) API call response
+    
+    Return:
+        (bool) True if the call returned HTTP 200, None if there is no response metadata
+    """
+    
+    metadata = response.get("ResponseMetadata") if response else None
+    if not metadata:
+        return None
+    
+    retry_attempts = metadata.get("RetryAttempts")
+    if retry_attempts:
+        logger.warning("RetryAttempts: %s", retry_attempts)
+    
+    result = metadata.get("HTTPStatusCode") == 200
+    logger.debug("result: %s", result)
+    
+    return result
+
+
+def _warm_clients():
+    """
+    Creates the clients used by this module ahead of their first use.
+    Failures are logged, and the client is created again on first use.
+    """
+    
+    for service_name in ("deadline", "iam", "sts"):
+        try:
+            _get_client(service_name)
+        except Exception:
+            logger.debug("Couldn't create %s client", service_name, exc_info=True)
+
+
+def _start_warming_clients():
+    """
+    Builds the clients in a background thread.
+    """
+    
+    threading.Thread(target=_warm_clients, daemon=True).start()
+
+
+def _reset_clients_after_fork():
+    """
+    Drops the session and clients inherited from the parent process,
+    which must not be shared across processes, and builds this process' own.
+    Lets pre-fork servers (gunicorn, uWSGI) warm each worker before its first request.
+    
+    The Deadline client library caches its sessions and clients too,
+    so those caches are cleared as well, where the library version has them.
+    """
+    
+    global _boto3_session, _clients_lock
+    
+    _boto3_session = None
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    
+    if hasattr(api._session, "invalidate_boto3_session_cache"):
+        api._session.invalidate_boto3_session_cache()
+    if hasattr(getattr(api._session, "get_session_client", None), "cache_clear"):
+        api._session.get_session_client.cache_clear()
+    
+    _start_warming_clients()
 
 
 def create_farm(display_name=None, studio_id=None, dry_run=None):
@@ -35,21 +159,11 @@ def create_farm(display_name=None, studio_id=None, dry_run=None):
         (str) ID of the created farm
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
-    dry_run = dry_run or False
-    
-    farm_id = None
-    try:
-        farm_response = deadline_client.create_farm(displayName=display_name, studioId=studio_id, dryRun=dry_run)
-        if farm_response and "farmId" in farm_response:
-            farm_id = farm_response["farmId"]
-            logger.debug(f"farm_id: {farm_id}")
-    except:
-        raise
+    farm_response = deadline_client.create_farm(displayName=display_name, studioId=studio_id, dryRun=dry_run or False)
+    farm_id = farm_response.get("farmId")
+    logger.debug("farm_id: %s", farm_id)
     
     return farm_id
 
@@ -65,24 +179,9 @@ def delete_farm(farm_id=None):
         (bool) True if delete_farm call was successful
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
-    
-    result = None
-    try:
-        delete_farm_response = deadline_client.delete_farm(farm_id=farm_id)
-        
-        if delete_farm_response and "ResponseMetadata" in delete_farm_response:
-            if "RetryAttempts" in delete_farm_response["ResponseMetadata"] and delete_farm_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {delete_farm_response['ResponseMetadata']['RetryAttempts']}")
-            result = delete_farm_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
-    return result
+    return _http_ok(deadline_client.delete_farm(farmId=farm_id))
 
 
 def create_queue(display_name=None, farm_id=None, job_run_as_user=None, job_attachment_settings=None, dry_run=None):
@@ -102,28 +201,18 @@ def create_queue(display_name=None, farm_id=None, job_run_as_user=None, job_atta
         (str) ID of the created queue
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
-    
-    dry_run = dry_run or False
-    
-    queue_id = None
-    try:
-        logger.debug(f"display_name: {display_name} farm_id: {farm_id}  job_run_as_user: {job_run_as_user}")
-        queue_response = deadline_client.create_queue(
-            displayName=display_name,
-            farmId=farm_id,
-            jobRunAsUser=job_run_as_user,
-            jobAttachmentSettings=job_attachment_settings,
-            dryRun=dry_run
-        )
-        if queue_response and "queueId" in queue_response:
-            queue_id = queue_response["queueId"]
-            logger.debug(f"queue_id: {queue_id}")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
+    
+    logger.debug("display_name: %s farm_id: %s  job_run_as_user: %s", display_name, farm_id, job_run_as_user)
+    queue_response = deadline_client.create_queue(
+        displayName=display_name,
+        farmId=farm_id,
+        jobRunAsUser=job_run_as_user,
+        jobAttachmentSettings=job_attachment_settings,
+        dryRun=dry_run or False
+    )
+    queue_id = queue_response.get("queueId")
+    logger.debug("queue_id: %s", queue_id)
     
     return queue_id
 
@@ -140,26 +229,12 @@ def delete_queue(farm_id=None, queue_id=None):
         (bool) True if delete_queue call was successful
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
-    
-    result = None
-    try:
-        delete_queue_response = deadline_client.delete_queue(
-            farmId=farm_id,
-            queueId=queue_id
-        )
-        if delete_queue_response and "ResponseMetadata" in delete_queue_response:
-            if "RetryAttempts" in delete_queue_response["ResponseMetadata"] and delete_queue_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {delete_queue_response['ResponseMetadata']['RetryAttempts']}")
-            result = delete_queue_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
-    return result
+    return _http_ok(deadline_client.delete_queue(
+        farmId=farm_id,
+        queueId=queue_id
+    ))
 
 
 def create_fleet(display_name=None, farm_id=None, role_arn=None, max_worker_count=None, configuration=None):
@@ -177,30 +252,44 @@ def create_fleet(display_name=None, farm_id=None, role_arn=None, max_worker_coun
         (dict) Info for the created fleet
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
     fleet_id = None
-    try:
-        fleet_response = deadline_client.create_fleet(
-            displayName=display_name,
-            farmId=farm_id,
-            roleArn=role_arn,
-            maxWorkerCount=max_worker_count,
-            configuration=configuration
-        )
-        
-        if fleet_response and "fleetId" in fleet_response:
-            fleet_id = fleet_response["fleetId"]
-            logger.debug(f"fleet_id: {fleet_id}")
-    except:
-        raise
+    fleet_response = deadline_client.create_fleet(
+        displayName=display_name,
+        farmId=farm_id,
+        roleArn=role_arn,
+        maxWorkerCount=max_worker_count,
+        configuration=configuration
+    )
+    
+    if fleet_response and "fleetId" in fleet_response:
+        fleet_id = fleet_response["fleetId"]
+        logger.debug("fleet_id: %s", fleet_id)
     
     return fleet_id
 
 
+def delete_fleet(farm_id=None, fleet_id=None):
+    """
+    Deletes a fleet on the specified farm.
+    
+    Args:
+        farm_id: (str) Farm ID
+        fleet_id: (str) Fleet ID
+    
+    Return:
+        (bool) True if delete_fleet call was successful
+    """
+    
+    deadline_client = _get_client("deadline")
+    
+    return _http_ok(deadline_client.delete_fleet(
+        farmId=farm_id,
+        fleetId=fleet_id
+    ))
+
+
 def get_queue(farm_id=None, queue_id=None):
     """
     Gets a queue from the specified farm.
@@ -213,21 +302,15 @@ def get_queue(farm_id=None, queue_id=None):
         (dict) Queue info
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
-    try:
-        queue_response = deadline_client.get_queue(
-            farmId=farm_id,
-            queueId=queue_id
-        )
-        if queue_response and "queueId" in queue_response:
-            queue_id = queue_response["queueId"]
-            logger.debug(f"queue_id: {queue_id}")
-    except:
-        raise
+    queue_response = deadline_client.get_queue(
+        farmId=farm_id,
+        queueId=queue_id
+    )
+    if queue_response and "queueId" in queue_response:
+        queue_id = queue_response["queueId"]
+        logger.debug("queue_id: %s", queue_id)
     
     return queue_id
 
@@ -245,28 +328,13 @@ def create_queue_fleet_association(farm_id=None, queue_id=None, fleet_id=None):
         (dict) Info for the created fleet association
     """
     
-    try:
-        deadline_client = api._session.get_boto3_client("deadline")
-    except:
-        raise
+    deadline_client = _get_client("deadline")
     
-    result = None
-    try:
-        associate_response = deadline_client.create_queue_fleet_association(
-            farmId=farm_id,
-            queueId=queue_id,
-            fleetId=fleet_id
-        )
-
-        if associate_response and "ResponseMetadata" in associate_response:
-            if "RetryAttempts" in associate_response["ResponseMetadata"] and associate_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {associate_response['ResponseMetadata']['RetryAttempts']}")
-            result = associate_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
-    
-    return result
+    return _http_ok(deadline_client.create_queue_fleet_association(
+        farmId=farm_id,
+        queueId=queue_id,
+        fleetId=fleet_id
+    ))
 
 
 def create_role(role_name=None, assume_role_policy_document=None):
@@ -281,22 +349,16 @@ def create_role(role_name=None, assume_role_policy_document=None):
         (dict) Created role
     """
     
-    try:
-        iam = api._session.get_boto3_client("iam")
-    except:
-        raise
+    iam = _get_client("iam")
     
     role = None
-    try:
-        role_response = iam.create_role(
-            RoleName=role_name,
-            AssumeRolePolicyDocument=assume_role_policy_document
-        )
-        if role_response and "Role" in role_response:
-            role = role_response["Role"]
-            logger.debug(f"role: {role}")
-    except:
-        raise
+    role_response = iam.create_role(
+        RoleName=role_name,
+        AssumeRolePolicyDocument=assume_role_policy_document
+    )
+    if role_response and "Role" in role_response:
+        role = role_response["Role"]
+        logger.debug("role: %s", role)
     
     return role
 
@@ -312,24 +374,9 @@ def delete_role(role_name=None):
         (bool) True if delete_role call was successful
     """
     
-    try:
-        iam = api._session.get_boto3_client("iam")
-    except:
-        raise
-    
-    result = None
-    try:
-        delete_role_response = iam.delete_role(RoleName=role_name)
-        
-        if delete_role_response and "ResponseMetadata" in delete_role_response:
-            if "RetryAttempts" in delete_role_response["ResponseMetadata"] and delete_role_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {delete_role_response['ResponseMetadata']['RetryAttempts']}")
-            result = delete_role_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
+    iam = _get_client("iam")
     
-    return result
+    return _http_ok(iam.delete_role(RoleName=role_name))
 
 
 def get_role(role_name=None):
@@ -343,21 +390,15 @@ def get_role(role_name=None):
         (dict) Role info
     """
     
-    try:
-        iam = api._session.get_boto3_client("iam")
-    except:
-        raise
+    iam = _get_client("iam")
     
     role = None
-    try:
-        role_response = iam.get_role(
-            RoleName=role_name
-        )
-        if role_response and "Role" in role_response:
-            role = role_response["Role"]
-            logger.debug(f"role: {role}")
-    except:
-        raise
+    role_response = iam.get_role(
+        RoleName=role_name
+    )
+    if role_response and "Role" in role_response:
+        role = role_response["Role"]
+        logger.debug("role: %s", role)
     
     return role
 
@@ -374,27 +415,13 @@ def put_role_policy(role_name=None, policy_name=None, policy_document=None):
         (bool) True if put_role_policy call was successful
     """
     
-    try:
-        iam = api._session.get_boto3_client("iam")
-    except:
-        raise
+    iam = _get_client("iam")
     
-    result = None
-    try:
-        role_policy_response = iam.put_role_policy(
-            RoleName=role_name,
-            PolicyName=policy_name,
-            PolicyDocument=policy_document
-        )
-        if role_policy_response and "ResponseMetadata" in role_policy_response:
-            if "RetryAttempts" in role_policy_response["ResponseMetadata"] and role_policy_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {role_policy_response['ResponseMetadata']['RetryAttempts']}")
-            result = role_policy_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
-    
-    return result
+    return _http_ok(iam.put_role_policy(
+        RoleName=role_name,
+        PolicyName=policy_name,
+        PolicyDocument=policy_document
+    ))
 
 
 def delete_role_policy(role_name=None, policy_name=None):
@@ -408,26 +435,12 @@ def delete_role_policy(role_name=None, policy_name=None):
     Return:
         (bool) True if delete_role_policy call was successful
     """
-    try:
-        iam = api._session.get_boto3_client("iam")
-    except:
-        raise
+    iam = _get_client("iam")
     
-    result = None
-    try:
-        role_policy_response = iam.delete_role_policy(
-            RoleName=role_name,
-            PolicyName=policy_name
-        )
-        if role_policy_response and "ResponseMetadata" in role_policy_response:
-            if "RetryAttempts" in role_policy_response["ResponseMetadata"] and role_policy_response["ResponseMetadata"]["RetryAttempts"]:
-                logger.warning(f"RetryAttempts: {role_policy_response['ResponseMetadata']['RetryAttempts']}")
-            result = role_policy_response["ResponseMetadata"]["HTTPStatusCode"] == 200
-            logger.debug(f"result: {result}")
-    except:
-        raise
-    
-    return result
+    return _http_ok(iam.delete_role_policy(
+        RoleName=role_name,
+        PolicyName=policy_name
+    ))
 
 
 def get_caller_identity():
@@ -438,19 +451,19 @@ def get_caller_identity():
         (dict) Caller identity information
     """
     
-    try:
-        sts = api._session.get_boto3_client("sts")
-    except:
-        raise
+    sts = _get_client("sts")
     
     result = None
-    try:
-        caller_identity_result = sts.get_caller_identity()
-        if caller_identity_result and "UserId" in caller_identity_result:
-            result = caller_identity_result
-            logger.debug(f"result: {result}")
-    except:
-        raise
+    caller_identity_result = sts.get_caller_identity()
+    if caller_identity_result and "UserId" in caller_identity_result:
+        result = caller_identity_result
+        logger.debug("result: %s", result)
     
     return result
 
+
+# Resolve credentials and build clients while the caller finishes starting up
+_start_warming_clients()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
@@ -1,31 +1,27 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
 from flask import Flask, redirect, request
+from werkzeug.exceptions import HTTPException
 
-import json
+import functools
 import logutil
-import logging
 import os
 import sys
-import traceback
-import urllib
+import uuid
+from urllib.parse import parse_qs, urlsplit
 
-from creator import create_farm_and_fleet, FLEET_CONFIGURATION_PATH
+# waitress is optional; it serves requests from a thread pool, rather than
+# Flask's development server
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
 
+from creator import create_farm_and_fleet, json_loads, FLEET_CONFIGURATION_PATH
 
-# Logging to file
-logutil.add_file_handler()
-logger = logging.getLogger(__name__)
-logger.setLevel(logutil.get_deadline_config_level())
 
-# Logging to stdout
-log_handler = logging.StreamHandler()
-log_fmt = logging.Formatter(
-    "%(asctime)s - [%(levelname)-7s] "
-    "[%(module)s:%(funcName)s:%(lineno)d] %(message)s"
-)
-log_handler.setFormatter(log_fmt)
-logger.addHandler(log_handler)
+# Logging to file and stdout
+logger = logutil.configure(__name__)
 
 
 app = Flask(__name__)
@@ -40,7 +36,10 @@ def get_configuration_data(json_path):
     Returns a dictionary containing configuration data.
     Data is stored as JSON.
     
-    Returns None if the document cannot be parsed as JSON.
+    The file is read once per normalized path; later calls return the same
+    dictionary, which is shared between callers, so it must not be modified.
+    
+    Raises exceptions if the document cannot be read or parsed as JSON.
     
     Args:
         json_path: (str) Path to JSON document
@@ -49,20 +48,40 @@ def get_configuration_data(json_path):
         (dict) Configuration settings
     """
     
-    data = {}
+    return _load_configuration_data(os.path.normpath(json_path))
+
+
+@functools.lru_cache(maxsize=4)
+def _load_configuration_data(json_path):
+    """
+    Reads and parses the configuration document at the specified path.
     
-    data_path = os.path.normpath(json_path)
+    Args:
+        json_path: (str) Normalized path to JSON document
     
-    with open(data_path, "r") as f:
-        try:
-            data = json.loads(f.read())
-        except Exception as e:
-            logger.exception(e)
+    Return:
+        (dict) Configuration settings
+    """
     
-    if not data:
-        data = {}
+    with open(json_path, "rb") as f:
+        return json_loads(f.read())
+
+
+@functools.lru_cache(maxsize=4)
+def _get_farm_url_template(studio_id):
+    """
+    Returns the console URL of farms in the studio's region,
+    with a {farm_id} field to format.
     
-    return data
+    Args:
+        studio_id: (str) Deadline Cloud Nimble Studio ID
+    
+    Return:
+        (str) Farm URL template
+    """
+    
+    region_id = studio_id.split(":", 1)[0]
+    return f"https://{region_id}.console.aws.amazon.com/deadlinecloud/home?region={region_id}#/farms/{{farm_id}}"
 
 
 def _parse_url(url):
@@ -78,30 +97,51 @@ def _parse_url(url):
         (dict) Parameters from the query
     """
     
-    if "?" not in url:
+    query = urlsplit(url).query
+    if not query:
         raise ValueError("No parameters given")
     
-    # Get the parameters as a list of key=value pairs 
-    try:
-        params_raw = urllib.parse.urlsplit(url).query.split("?")[-1].split("&")
-    except:
-        raise
+    # Each key maps to a list of its decoded values, in query order
+    params_raw = parse_qs(query, keep_blank_values=True)
     
-    # If columns are returned, build lists of column results
+    # column_display_names and cols occur for each column, so keep their lists.
+    # Other keys keep their last value.
     params = {"column_display_names": [], "cols": []}
-    for param in params_raw:
-        key, value = map(urllib.parse.unquote, param.split("=", 1))
-        if key in ["column_display_names", "cols"]:
-            # column_display_names and cols occur for each column
-            params[key].append(value)
+    for key, values in params_raw.items():
+        if key in params:
+            params[key] = values
         else:
-            params[key] = value
+            params[key] = values[-1]
     
-    logger.debug(f"params: {params}")
+    logger.debug("params: %s", params)
     
     return params
 
 
+@app.errorhandler(Exception)
+def _handle_exception(e):
+    """
+    Logs an exception raised while handling a request and returns a short error response.
+    
+    The traceback goes to the farm creator log only, tagged with an error ID
+    that is shown to the user so the log entry can be found.
+    HTTP errors such as 404 are passed through unchanged.
+    
+    Args:
+        e: (Exception) The unhandled exception
+    
+    Return:
+        (tuple) Response body and HTTP status code
+    """
+    
+    if isinstance(e, HTTPException):
+        return e
+    
+    error_id = uuid.uuid4().hex[:8]
+    logger.error("Request failed (error ID %s)", error_id, exc_info=e)
+    return f"Error: Internal error (error ID {error_id}). Please check the farm creator logs for more information.", 500
+
+
 @app.route("/farm_creator", methods=["GET", "POST"])
 def farm_creator():
     """
@@ -118,20 +158,18 @@ def farm_creator():
         (str) Error messages
     """
     
-    logger.debug(f"request.method: {request.method}")
+    logger.debug("request.method: %s", request.method)
     
     params = None
     if request.method == "POST":
-        try:
-            params = request.form.to_dict()
-        except:
-            return traceback.format_exc()
+        params = request.form.to_dict()
         
     elif request.method == "GET":
         try:
             params = _parse_url(request.url)
-        except:
-            return traceback.format_exc()
+        except ValueError:
+            # No query was given; reported below
+            pass
         
     else:
         pass
@@ -146,46 +184,34 @@ def farm_creator():
         return "Error: Please run this Action Menu Item from the Project Actions menu of a Project page."
     
     
-    result = None
-    
     # Parse params
-    logger.debug(f"params: {params}")
-    project_name = None
-    hostname = None
-    try:
-        project_name = params["project_name"]
-        hostname = params["server_hostname"].split(".", 1)[0]
-    except:
-        return traceback.format_exc()
+    logger.debug("params: %s", params)
+    project_name = params["project_name"]
+    hostname = params["server_hostname"].split(".", 1)[0]
     
     name_farm = project_name
     name_queue = f"{project_name} Queue"
     name_fleet = f"{project_name} Fleet"
     
     
-    farm_result = None
-    try:
-        # farm_result = create_farm_and_fleet()
-        farm_result = create_farm_and_fleet(
-            studio_id=settings["studio_id"],
-            name_farm=name_farm,
-            name_queue=name_queue,
-            name_fleet=name_fleet,
-            fleet_configuration_path=FLEET_CONFIGURATION_PATH,
-            max_worker_count=int(settings["max_worker_count"]),
-            job_run_as_user=settings["job_run_as_user"],
-            job_attachment_settings=settings["job_attachment_settings"]
-        )
-        logger.info(f"farm_result: {farm_result}")
-        
-    except:
-        result = traceback.format_exc()
-        return result
+    # Settings are read once and cached, including when the app is hosted by a WSGI server
+    settings = get_configuration_data(CONFIGURATION_DATA_PATH)
+    
+    farm_result = create_farm_and_fleet(
+        studio_id=settings["studio_id"],
+        name_farm=name_farm,
+        name_queue=name_queue,
+        name_fleet=name_fleet,
+        fleet_configuration_path=FLEET_CONFIGURATION_PATH,
+        max_worker_count=int(settings["max_worker_count"]),
+        job_run_as_user=settings["job_run_as_user"],
+        job_attachment_settings=settings["job_attachment_settings"]
+    )
+    logger.info("farm_result: %s", farm_result)
     
     # Alert user if there was an error that couldn't be directly reported
     if farm_result is None:
-        result = "Error: No result was returned by the farm creator. Please check the farm creator logs for more information."
-        return result
+        return "Error: No result was returned by the farm creator. Please check the farm creator logs for more information."
     
     
     # Alert user to reported errors
@@ -193,23 +219,16 @@ def farm_creator():
         return f"Error: {farm_result['error']}"
     
     
-    try:
-        region_id = settings["studio_id"].split(":")[0]
-        farm_id = farm_result["farm_id"]
-        farm_url = f"https://{region_id}.console.aws.amazon.com/deadlinecloud/home?region={region_id}#/farms/{farm_id}"
-        
-        logger.info(f"Redirecting to: {farm_url}")
-        result = redirect(farm_url)
-    except:
-        result = traceback.format_exc()
+    farm_url = _get_farm_url_template(settings["studio_id"]).format(farm_id=farm_result["farm_id"])
     
-    return result
+    logger.info("Redirecting to: %s", farm_url)
+    return redirect(farm_url)
 
 
 if __name__ == "__main__":
     # Verify settings file exists
     if not os.path.exists(CONFIGURATION_DATA_PATH):
-        logger.error(f"Path not found: {CONFIGURATION_DATA_PATH}")
+        logger.error("Path not found: %s", CONFIGURATION_DATA_PATH)
         sys.exit(1)
     
     # Load settings
@@ -223,9 +242,14 @@ if __name__ == "__main__":
     try:
         host = settings["listener_host"]
         port = settings["listener_port"]
+        _get_farm_url_template(settings["studio_id"])
     except Exception as e:
         logger.exception(e)
         sys.exit(1)
     
-    # Start listener
-    app.run(host=host, port=port)
+    # Start listener. Each request is handled on its own thread, so concurrent
+    # ShotGrid requests don't wait on each other's AWS calls.
+    if serve is not None:
+        serve(app, host=host, port=port, threads=16)
+    else:
+        app.run(host=host, port=port)
@@ -1,6 +1,11 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
+import atexit
+import functools
 import logging
+import logging.handlers
+import os
+import queue
 from datetime import datetime
 from pathlib import Path
 
@@ -11,6 +16,116 @@ _DEFAULT_FORMATTER = logging.Formatter(
     datefmt="%y-%m-%d %Hh%Mm%Ss",
 )
 
+_STDOUT_FORMATTER = logging.Formatter(
+    "%(asctime)s - [%(levelname)-7s] "
+    "[%(module)s:%(funcName)s:%(lineno)d] %(message)s"
+)
+
+# Single stdout handler shared by every logger, run from the queue listener
+STDOUT_HANDLER = logging.StreamHandler()
+STDOUT_HANDLER.setFormatter(_STDOUT_FORMATTER)
+
+# Queue listeners, keyed by the logger whose handlers they run. Records are queued
+# by the thread that logs them and written by the listener thread, so formatting
+# and output don't block callers. Records still propagate to parent loggers, which
+# write them through their own listener, as if the handlers were on the loggers.
+_queue_listeners = {}
+
+# File handlers on the queue listener, keyed by the absolute path of their file
+_file_handlers = {}
+
+# Set once file and stdout logging have been set up by configure()
+_configured = False
+
+
+def _start_queue_listener(logger, handlers):
+    """Start (or restart) the logger's queue listener with the specified handlers.
+    
+    The logger gets a queue handler feeding the listener when it is first started.
+    """
+    
+    queue_listener = _queue_listeners.get(logger)
+    if queue_listener is not None:
+        queue_listener.stop()
+        log_queue = queue_listener.queue
+    else:
+        log_queue = queue.Queue(-1)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    
+    queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_listener.start()
+    _queue_listeners[logger] = queue_listener
+
+
+def _stop_queue_listeners():
+    """Stop the queue listeners, flushing any records still queued."""
+    
+    while _queue_listeners:
+        _queue_listeners.popitem()[1].stop()
+
+
+def _restart_queue_listeners_after_fork():
+    """Give a forked process its own queue listeners.
+    
+    Only the forking thread survives a fork, so the listener threads inherited from
+    the parent process don't run and records queued in the child would never be written.
+    New queues are used in case the parent held a queue's lock when it forked.
+    """
+    
+    for logger, queue_listener in list(_queue_listeners.items()):
+        log_queue = queue.Queue(-1)
+        for handler in logger.handlers:
+            if isinstance(handler, logging.handlers.QueueHandler) and handler.queue is queue_listener.queue:
+                handler.queue = log_queue
+        
+        queue_listener = logging.handlers.QueueListener(log_queue, *queue_listener.handlers, respect_handler_level=True)
+        queue_listener.start()
+        _queue_listeners[logger] = queue_listener
+
+
+atexit.register(_stop_queue_listeners)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_queue_listeners_after_fork)
+
+
+@functools.lru_cache(maxsize=8)
+def _default_log_path(today_stamp):
+    """Get the default log file for the given day, creating its directory.
+    
+    Cached so the directory is only created once per day.
+    
+    Args:
+        today_stamp: The day, formatted as YYYY-MM-DD.
+    """
+    
+    file = Path.home() / ".deadline" / "logs" / "farm_creator" / f"farm_creator_{today_stamp}.log"
+    file.parent.mkdir(parents=True, exist_ok=True)
+    return file
+
+
+def _add_queued_handler(handler, logger):
+    """Add a handler to the logger's queue listener, starting it if needed."""
+    
+    queue_listener = _queue_listeners.get(logger)
+    handlers = list(queue_listener.handlers) if queue_listener is not None else []
+    if handler not in handlers:
+        handlers.append(handler)
+        _start_queue_listener(logger, handlers)
+
+
+def add_stdout_handler(logger: logging.Logger = logging.getLogger()):
+    """Add the shared stdout handler to the specified logger.
+    
+    Does nothing if the logger already has the handler.
+    Records from child loggers propagate to it, so adding it to the root logger
+    is enough for every logger.
+    
+    Args:
+        logger: The logger to add the handler to. Defaults to the root logger.
+    """
+    
+    _add_queued_handler(STDOUT_HANDLER, logger)
+
 
 def add_file_handler(
     file: Path | None = None,
@@ -20,37 +135,66 @@ def add_file_handler(
 ):
     """Configure and add a file handler to the specified logger.
     
-    If a handler with the same output file already exists on the logger, replace it.
+    Handlers are run from a background queue listener for the logger, fed by a
+    queue handler on the logger. Only records logged to the logger and its
+    children are written, and they still propagate to the parent loggers' handlers.
+    
+    If a handler with the same output file already exists,
+    it is reused with the new formatter and level rather than opened again.
     
     Args:
-        file: The file to log to. Defaults to a file at `~/.deadline/logs/blender`.
+        file: The file to log to. Defaults to a file for today at `~/.deadline/logs/farm_creator`.
         logger: The logger to add the handler to. Defaults to the root logger.
         fmt: The format string to use for the log messages on the new handler.
         level: The level to set the handler to. Defaults to DEBUG.
     """
     
     if file is None:
-        today_stamp = datetime.strftime(datetime.now(), "%Y-%m-%d")
-        file = Path.home() / ".deadline" / "logs" / "farm_creator" / f"farm_creator_{today_stamp}.log"
-        file.parent.mkdir(parents=True, exist_ok=True)
+        file = _default_log_path(datetime.now().strftime("%Y-%m-%d"))
     
-    handler = logging.FileHandler(file, mode="a")
-    handler.setFormatter(fmt)
-    handler.setLevel(level)
+    handler = _file_handlers.get(os.path.abspath(file))
+    if handler is not None:
+        handler.setFormatter(fmt)
+        handler.setLevel(level)
+    else:
+        handler = logging.FileHandler(file, mode="a")
+        handler.setFormatter(fmt)
+        handler.setLevel(level)
+        _file_handlers[handler.baseFilename] = handler
     
-    # Find the handlers with the same file as the one we're adding, if any, and remove it.
-    existing = []
-    for h in logger.handlers:
-        if isinstance(h, logging.FileHandler) and h.baseFilename == handler.baseFilename:
-            existing.append(h)
-    for h in existing:
-        logger.removeHandler(h)
-        logger.info(f"Removed existing file handler: {h}")
+    _add_queued_handler(handler, logger)
+    logger.debug("Added file handler; count=%d", len(_file_handlers))
+
+
+def configure(logger_name):
+    """Get the named logger, set to the Deadline configuration log level.
+    
+    File and stdout logging are set up on the first call only,
+    so modules can call this at import without adding duplicate handlers.
+    
+    Args:
+        logger_name: Name of the logger to configure.
     
-    logger.addHandler(handler)
-    logger.info(f"Added file handler to handlers: {logger.handlers}")
+    Returns:
+        The configured logger.
+    """
+    
+    global _configured
+    
+    if not _configured:
+        add_stdout_handler()
+        add_file_handler()
+        _configured = True
+    
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(get_deadline_config_level())
+    return logger
 
 
+@functools.lru_cache(maxsize=1)
 def get_deadline_config_level():
-    """Get the current log level set in the Deadline configuration file."""
+    """Get the log level set in the Deadline configuration file.
+    
+    The file is read on the first call only.
+    """
     return config.config_file.get_setting("settings.log_level")